@@ -2,26 +2,218 @@ import numpy as np
 import pandas as pd
 import sys
 import logging
-from tqdm.notebook import trange, tqdm
-import matplotlib.pyplot as plot
+from functools import cached_property
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: without it the kernels below run as plain Python.
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
 
 # Set up the Logger for debugging.
 FORMAT = "[%(asctime)s %(filename)s->%(funcName)s():%(lineno)s]%(levelname)s: %(message)s"
 logging.basicConfig(format=FORMAT, level=logging.INFO)
 L = logging.getLogger(__name__)
 
+# Number of drawdowns found between progress bar updates in make_drawdowns.
+PROGRESS_CHUNK = 100000
+
 def cum_dist(data):
     x = np.sort(data)
     y = np.arange(len(data))/float(len(data))
     return x, y
 
+@njit(cache=True)
+def _find_turning_points(S):
+    """Returns the locations where S starts increasing (`rev > 0`) and where
+    it stops increasing (`rev < 0`), walking S once."""
+    n = len(S)
+    up_locs = np.empty(n, np.int64)
+    down_locs = np.empty(n, np.int64)
+    n_up = 0
+    n_down = 0
+    if n > 1:
+        was_increasing = S[1] > S[0]
+        for j in range(1, n - 1):
+            increasing = S[j + 1] > S[j]
+            if increasing and not was_increasing:
+                up_locs[n_up] = j
+                n_up += 1
+            elif was_increasing and not increasing:
+                down_locs[n_down] = j
+                n_down += 1
+            was_increasing = increasing
+    return up_locs[:n_up].copy(), down_locs[:n_down].copy()
+
+@njit(cache=True)
+def _first_leq(S, v, start):
+    """Returns the first index from `start` onwards where `S <= v` (-1 if none)."""
+    n = len(S)
+    i = start
+    # Compare whole blocks of values so the loop can be vectorised, and only
+    # look for the exact position once a block contains a match.
+    while i + 8 <= n:
+        hit = False
+        for j in range(i, i + 8):
+            hit |= S[j] <= v
+        if hit:
+            break
+        i += 8
+    while i < n:
+        if S[i] <= v:
+            return i
+        i += 1
+    return -1
+
+@njit(cache=True)
+def _last_leq(S, v, stop):
+    """Returns the last index before `stop` where `S <= v` (-1 if none)."""
+    i = stop
+    while i >= 8:
+        hit = False
+        for j in range(i - 8, i):
+            hit |= S[j] <= v
+        if hit:
+            break
+        i -= 8
+    while i > 0:
+        i -= 1
+        if S[i] <= v:
+            return i
+    return -1
+
+@njit(cache=True)
+def _rmq_nb(table, vals, l, r):
+    """Returns the index of the (first) smallest value in `vals[l:r]`
+    using a sparse table built by `Drawdown._build_rmq`."""
+    # The last peak may have no valley after it, so `r` can run past the end.
+    r = min(r, len(vals))
+    k = 0
+    while (2 << k) <= r - l:
+        k += 1
+    a = table[k, l]
+    b = table[k, r - (1 << k)]
+    if vals[a] <= vals[b]:
+        return a
+    return b
+
+@njit(cache=True)
+def _prev_greater_or_equal(a):
+    """Returns, for each element of `a`, the index of the nearest element to
+    its left that is greater than or equal to it (-1 if there is none)."""
+    n = len(a)
+    res = np.full(n, -1, np.int64)
+    stack = np.empty(n, np.int64)
+    top = 0
+    for i in range(n):
+        while top > 0 and a[stack[top - 1]] < a[i]:
+            top -= 1
+        if top > 0:
+            res[i] = stack[top - 1]
+        stack[top] = i
+        top += 1
+    return res
+
+@njit(cache=True)
+def _next_greater_or_equal(a):
+    """Returns, for each element of `a`, the index of the nearest element to
+    its right that is greater than or equal to it (len(a) if there is none)."""
+    n = len(a)
+    res = np.full(n, n, np.int64)
+    stack = np.empty(n, np.int64)
+    top = 0
+    for i in range(n - 1, -1, -1):
+        while top > 0 and a[stack[top - 1]] < a[i]:
+            top -= 1
+        if top > 0:
+            res[i] = stack[top - 1]
+        stack[top] = i
+        top += 1
+    return res
+
+@njit(cache=True, fastmath=True)
+def _find_all_drawdowns_nb(first, stop, S, down_locs, down_vals, up_locs, up_vals, rmq_table,
+                           prev_ge, next_ge, zero_left, zero_right,
+                           peak_loc, peak_val, start_loc, start_val, end_loc, end_val,
+                           filling, draining, duration, magnitude, type_code):
+    """Finds drawdowns `first` to `stop - 1` in one compiled pass.
+
+    Follows the same steps as `Drawdown.find_drawdown`, `Drawdown.find_start`
+    and `Drawdown.find_end`, but works on raw arrays, takes the nearest higher
+    peaks on either side from `prev_ge` and `next_ge` and the nearest zeros on
+    either side from `zero_left` and `zero_right` (-1 and len(S) if there are
+    none), and writes drawdown `i` into row `i - 1` of the preallocated output
+    arrays (`peak_loc` onwards).
+    `type_code` is 0 for `filling` and 1 for `draining`.
+    """
+    last = len(S) - 1
+    for i in range(first, stop):
+        peak = down_vals[i]
+        loc = down_locs[i]
+        # Start: smallest valley after the nearest higher peak to the left...
+        start = 0
+        j = prev_ge[i]
+        if j >= 0:
+            start = up_locs[_rmq_nb(rmq_table, up_vals, j, i)]
+        # ...or the nearest zero to the left, whichever is closer.
+        if zero_left[i] > start:
+            start = zero_left[i]
+        # End: smallest valley before the nearest higher peak to the right...
+        end = last
+        j = next_ge[i]
+        if j < len(down_vals):
+            end = up_locs[_rmq_nb(rmq_table, up_vals, i, j)]
+        # ...or the nearest zero to the right, whichever is closer.
+        if zero_right[i] < end:
+            end = zero_right[i]
+        else:
+            # No zero: fall back to the smallest future up_val.
+            nearest_minimum = up_locs[_rmq_nb(rmq_table, up_vals, i, end)]
+            if nearest_minimum > last:
+                nearest_minimum = last
+            if nearest_minimum < end:
+                end = nearest_minimum
+        fill = np.float64(peak) - S[start]
+        drain = np.float64(peak) - S[end]
+        out = i - 1
+        if fill <= drain:
+            # Filling drawdown: end at the first value to the right that is
+            # no larger than the start value.
+            type_code[out] = 0
+            end_val[out] = S[start]
+            start_val[out] = S[start]
+            j = _first_leq(S, S[start], loc)
+            if j >= 0:
+                end = j
+            magnitude[out] = fill
+        else:
+            # Draining drawdown: start at the last value to the left that is
+            # no larger than the end value.
+            type_code[out] = 1
+            start_val[out] = S[end]
+            end_val[out] = S[end]
+            j = _last_leq(S, S[end], loc)
+            if j >= 0:
+                start = j
+            magnitude[out] = drain
+        peak_loc[out] = loc
+        peak_val[out] = peak
+        start_loc[out] = start
+        end_loc[out] = end
+        filling[out] = fill
+        draining[out] = drain
+        duration[out] = end - start
+
 class Drawdown:
     
     def __init__(self, 
                  data=None, 
                  filename=None, 
                  find_drawdowns=False,
-                 debug=False):
+                 debug=False,
+                 dtype=np.float64):
         """Initializes a Drawdown object.
 
         Parameters
@@ -34,6 +226,12 @@ class Drawdown:
             determines if drawdown analysis should be done during initialization, by default False
         debug : bool, optional
             determines if debugging messages will be logged, by default False
+        dtype : np_dtype, optional
+            dtype used to store the PAWS data, by default np.float64.
+            np.float32 halves the memory scanned when finding drawdowns, but
+            the output values pick up single-precision rounding. Integer
+            input is always converted, so its output values are written as
+            floats (e.g. 50.0 rather than 50).
         
         Usage
         -----
@@ -50,20 +248,18 @@ class Drawdown:
         """
         if debug == True:
             L.setLevel(logging.DEBUG)
-        if data:
-            self.S = data
+        if data is not None:
+            self.S = np.asarray(data, dtype=dtype)
         elif filename:
-            self.S = np.array(pd.read_csv(filename)).T.squeeze()
+            self.S = np.asarray(pd.read_csv(filename), dtype=dtype).T.squeeze()
         # Insert a leading non-zero value to force a up_val at the start of the
         # Storage timeseries.
-        if self.S[0] != 9.99:
-            self.S = np.insert(self.S, 0, 9.99)
-        self._down_locs = self.down_locs()
-        self._down_vals = self.down_vals()
-        self._up_locs = self.up_locs()
-        self._up_vals = self.up_vals()
-        L.info("There are {n} total downvals".format(n=len(self._down_vals)))
-        L.info("There are {n} total upvals".format(n=len(self._up_vals)))
+        sentinel = self.S.dtype.type(9.99)
+        if self.S[0] != sentinel:
+            self.S = np.concatenate(([sentinel], self.S))
+        self.invalidate()
+        L.info("There are %s total downvals", len(self.down_vals))
+        L.info("There are %s total upvals", len(self.up_vals))
         if find_drawdowns:
             L.info("Cacluating drawdowns...")
             self.make_drawdowns()
@@ -73,12 +269,70 @@ class Drawdown:
         Constructs drawdowns based on PAWS data.
         
         """
-        n = min(len(self._down_vals), len(self._up_vals))
-        self.drawdowns = []
         # Start at the 2nd down_loc (we put a dummy down_loc at the start)
-        for i in trange(1, n):
-                self.drawdowns.append(self.find_drawdown(i))
-        self.df = pd.DataFrame(self.drawdowns)
+        n = max(min(len(self.down_vals), len(self.up_vals)) - 1, 0)
+        peak_loc = np.empty(n, np.int64)
+        peak_val = np.empty(n, np.float64)
+        start_loc = np.empty(n, np.int64)
+        start_val = np.empty(n, np.float64)
+        end_loc = np.empty(n, np.int64)
+        end_val = np.empty(n, np.float64)
+        filling = np.empty(n, np.float64)
+        draining = np.empty(n, np.float64)
+        duration = np.empty(n, np.int64)
+        magnitude = np.empty(n, np.float64)
+        type_code = np.empty(n, np.int8)
+        # Look up the nearest zero on either side of every peak in one batch.
+        # Padding the zero locations with -1 and len(S) stands in for "no zero".
+        zeros = np.concatenate(([-1], self._zero_locs, [len(self.S)]))
+        zero_left = zeros[np.searchsorted(self._zero_locs, self.down_locs, side='left')]
+        zero_right = zeros[np.searchsorted(self._zero_locs, self.down_locs, side='right') + 1]
+        # Only long series are worth a progress bar, and it is updated once
+        # per chunk of drawdowns rather than once per drawdown.
+        chunks = range(1, n+1, PROGRESS_CHUNK)
+        if len(chunks) > 1:
+            from tqdm.auto import tqdm
+            chunks = tqdm(chunks, mininterval=0.5)
+        for first in chunks:
+            _find_all_drawdowns_nb(
+                first, min(first + PROGRESS_CHUNK, n+1),
+                self.S, self.down_locs, self.down_vals,
+                self.up_locs, self.up_vals, self._rmq_table,
+                self._prev_ge, self._next_ge, zero_left, zero_right,
+                peak_loc, peak_val, start_loc, start_val, end_loc, end_val,
+                filling, draining, duration, magnitude, type_code)
+        self.df = pd.DataFrame({
+            'i': np.arange(1, n+1),
+            'peak_loc': peak_loc,
+            'peak_val': peak_val,
+            'start_loc': start_loc,
+            'start_val': start_val,
+            'end_loc': end_loc,
+            'end_val': end_val,
+            'filling': filling,
+            'draining': draining,
+            'magnitude': magnitude,
+            'type': np.array(['filling', 'draining'], dtype=object)[type_code],
+            'duration': duration,
+        })
+
+    def invalidate(self):
+        """Clears everything cached from `S`, including `df`. Call this after
+        replacing `S`, then `make_drawdowns` to find the new drawdowns."""
+        for name in ('slope', 'rev', '_turning_points',
+                     'down_locs', 'up_locs', 'down_vals', 'up_vals'):
+            self.__dict__.pop(name, None)
+        # Drawdowns found from the old S no longer line up with it.
+        self.__dict__.pop('df', None)
+        self._drawdown_cache = {}
+        # Sorted locations of every zero in S, used to find the nearest zero
+        # on either side of a peak with a binary search.
+        self._zero_locs = np.flatnonzero(self.S == 0)
+        # Nearest peak at least as high as each peak, on either side. Shared by
+        # find_start, find_end and make_drawdowns.
+        self._prev_ge = _prev_greater_or_equal(self.down_vals)
+        self._next_ge = _next_greater_or_equal(self.down_vals)
+        self._build_rmq()
 
     def find_drawdown(self, i, debug=False):
         """_summary_
@@ -97,11 +351,18 @@ class Drawdown:
         """
         if debug:
             L.setLevel(logging.DEBUG)
-        L.debug(f"Finding Drawdown {i}")
+        # Drawdowns only depend on `S`, so reuse earlier results unless the
+        # caller wants to see the debugging messages.
+        if i not in self._drawdown_cache or debug:
+            self._drawdown_cache[i] = self._find_drawdown(i)
+        return dict(self._drawdown_cache[i])
+
+    def _find_drawdown(self, i):
+        L.debug("Finding Drawdown %s", i)
         this = {}
         this['i'] = i
-        this['peak_loc'] = self._down_locs[i]
-        this['peak_val'] = self._down_vals[i]
+        this['peak_loc'] = self.down_locs[i]
+        this['peak_val'] = self.down_vals[i]
         #################################################
         # FINDING START AND END TO DRAWDOWNS            #
         #                                               #
@@ -110,9 +371,9 @@ class Drawdown:
         this['end_loc'], this['end_val'] = self.find_end(i)
         
         # filling is the difference between the peak value and the starting value (ascending limb)
-        this['filling'] = this['peak_val'] - this['start_val']
+        this['filling'] = float(this['peak_val']) - float(this['start_val'])
         # draining is the difference between the peak value and the ending value (descending limb)
-        this['draining'] = this['peak_val'] - this['end_val']
+        this['draining'] = float(this['peak_val']) - float(this['end_val'])
         # The magnitude of this drawdown is the minimum of the desending and ascending limbs
         this['magnitude'] = min(this['filling'], this['draining'])
         idx_peak = this['peak_loc']
@@ -123,43 +384,44 @@ class Drawdown:
         # If the filling limb was smaller, then we have a filling drawdown.
         # In that case, assign the end_val to be the same as the start_val
         if this['magnitude'] == this['filling']:
-            L.debug(f"Drawdown {i} is `filling` type.")
+            L.debug("Drawdown %s is `filling` type.", i)
             this['type'] = 'filling'
-            L.debug("\tUpdating `end_val` to {val} from {old}".format(
-                val=this['start_val'],
-                old=this['end_val']
-            ))
+            L.debug("\tUpdating `end_val` to %s from %s", this['start_val'], this['end_val'])
             this['end_val'] = this['start_val']
             # We need to update the end_loc find the nearest location to the right of this peak
             # that is less than or equal to the end_val.
-            L.debug(
-                f"Searching for nearest value to the right that is smaller than {this['end_val']}"
-            )
-            this['end_loc'] = idx_peak + np.min(np.where(self.S[idx_peak:] <= this['end_val']))
-            L.debug(f"Found new end_loc at {this['end_loc']}, which is equal to {self.S[this['end_loc']]}")
+            L.debug("Searching for nearest value to the right that is smaller than %s", this['end_val'])
+            end_loc = _first_leq(self.S, this['end_val'], idx_peak)
+            # Keep the provisional end_loc if nothing to the right is small
+            # enough, as make_drawdowns does.
+            if end_loc >= 0:
+                this['end_loc'] = end_loc
+                if L.isEnabledFor(logging.DEBUG):
+                    L.debug("Found new end_loc at %s, which is equal to %s", this['end_loc'], self.S[this['end_loc']])
+            else:
+                L.debug("No value to the right is smaller than %s; keeping end_loc %s", this['end_val'], this['end_loc'])
         else:
         # If the draining limb was smaller, then we have a draining drawdown.
         # In that case, assign the start_val to be the same as the end_val
-            L.debug(f"Drawdown {i} is `draining` type.")
+            L.debug("Drawdown %s is `draining` type.", i)
             this['type'] = 'draining'
-            L.debug("\tUpdating `start_val` to {val} from {old}".format(
-                val=this['end_val'],
-                old=this['start_val']
-            ))
+            L.debug("\tUpdating `start_val` to %s from %s", this['end_val'], this['start_val'])
             this['start_val'] = this['end_val']
-            L.debug(
-                f"Searching for nearest value to the left that is smaller than {this['start_val']}"
-            )
-            this['start_loc'] = np.max(
-                np.where(self.S[:idx_peak] <= this['start_val']))
-            L.debug(
-                f"Found new start_loc at {this['start_loc']}, which is equal to {self.S[this['start_loc']]}")
-        # Save all the drawdown data
-        this['data'] = self.S[this['start_loc']:this['end_loc']+1]
+            L.debug("Searching for nearest value to the left that is smaller than %s", this['start_val'])
+            start_loc = _last_leq(self.S, this['start_val'], idx_peak)
+            # Keep the provisional start_loc if nothing to the left is small
+            # enough (e.g. data above the leading 9.99), as make_drawdowns does.
+            if start_loc >= 0:
+                this['start_loc'] = start_loc
+                if L.isEnabledFor(logging.DEBUG):
+                    L.debug("Found new start_loc at %s, which is equal to %s", this['start_loc'], self.S[this['start_loc']])
+            else:
+                L.debug("No value to the left is smaller than %s; keeping start_loc %s", this['start_val'], this['start_loc'])
         # Set the final duration based on the updated start_loc and end_locs
         this['duration'] = this['end_loc'] - this['start_loc']
         return this
         
+    @cached_property
     def up_vals(self):
         """ Returns a list of the values of storage associated with each location
         where storage shifted from increasing to decreasing
@@ -173,8 +435,9 @@ class Drawdown:
         down_val -> up_val -> down_val
         
         """
-        return self.S[self.up_locs()]
+        return self.S[self.up_locs]
     
+    @cached_property
     def down_vals(self):
         """ Returns a list of the values of storage associated with each location
         where storage shifted from decreasing to increasing.
@@ -183,8 +446,9 @@ class Drawdown:
         Upward inflection points are usually times when a new drawdown begins.
         
         """
-        return self.S[self.down_locs()]
+        return self.S[self.down_locs]
      
+    @cached_property
     def slope(self):
         """Returns fist derivative of the Storage timeseries
         
@@ -194,6 +458,7 @@ class Drawdown:
         """
         return np.diff(self.S)
 
+    @cached_property
     def rev(self):
         """Returns locations where the time series reverses direction
         
@@ -207,8 +472,9 @@ class Drawdown:
         
         4. Returns an array of {-1, +1, 0} for each location in time series.
         """
-        return np.diff((self.slope() > 0).astype(int))
+        return np.diff((self.slope > 0).view(np.int8))
 
+    @cached_property
     def down_locs(self):
         """ Return the location of all places where storage switched from
             decreasing to increasing (a local "valley" in storage amount) 
@@ -219,11 +485,11 @@ class Drawdown:
             NOTE: Do we need to add a "dummy" data point to the end of the data?
             
         """
-        # Add 0 to the list of down_locs, since we have started the data with a 
-        # dummy data point.
-        down_locs = np.hstack([0, np.where(self.rev() < 0)[0]])
-        return down_locs + 1
+        # Add a dummy down_loc at the start of the list, since we have started
+        # the data with a dummy data point.
+        return np.hstack([1, self._turning_points[1]])
     
+    @cached_property
     def up_locs(self):
         """ Return the location of all places where storage switched from 
             increasing to decreasing (a local "peak" in storage amount)
@@ -232,9 +498,42 @@ class Drawdown:
             Downward inflection points are usually times when a peak occurs.
         
         """
-        up_locs, = np.where(self.rev() > 0)
-        return up_locs + 1
+        return self._turning_points[0]
+
+    @cached_property
+    def _turning_points(self):
+        """Returns (up_locs, down_locs) from a single pass over S, without
+        building the `slope` and `rev` arrays (the dummy down_loc is not included).
+        """
+        return _find_turning_points(self.S)
     
+    def _build_rmq(self):
+        """Builds a sparse table for range-minimum queries over `_up_vals`.
+
+        Row k of the table holds the location of the smallest up_val in each
+        window of length 2**k, so that the smallest valley between any two
+        peaks can be found with two lookups (see `_rmq`).
+        """
+        up_vals = self.up_vals
+        n = len(up_vals)
+        K = int(np.log2(max(n, 1))) + 1
+        st = np.empty((K, n), dtype=np.intp)
+        st[0] = np.arange(n)
+        for k in range(1, K):
+            left = st[k-1, :n-(1<<k)+1]
+            right = st[k-1, (1<<(k-1)):n-(1<<(k-1))+1]
+            st[k, :n-(1<<k)+1] = np.where(up_vals[left] <= up_vals[right], left, right)
+        self._rmq_table = st
+
+    def _rmq(self, l, r):
+        """Returns the index of the (first) smallest up_val in `_up_vals[l:r]`"""
+        # The last peak may have no valley after it, so `r` can run past the end.
+        r = min(r, len(self.up_vals))
+        k = int(r - l).bit_length() - 1
+        a = self._rmq_table[k, l]
+        b = self._rmq_table[k, r-(1<<k)]
+        return a if self.up_vals[a] <= self.up_vals[b] else b
+
     def find_start(self, i):
         """
         
@@ -250,47 +549,24 @@ class Drawdown:
         """
         start_loc = 0
         L.debug("Looking for initial start position...")
-        L.debug("Drawdown {i} peak is {peak} at location {loc}".format(
-            i=i,
-            peak=self._down_vals[i],
-            loc=self._down_locs[i],
-        ))
+        L.debug("Drawdown %s peak is %s at location %s", i, self.down_vals[i], self.down_locs[i])
+        peak_loc = self.down_locs[i]
         # Step 2: Look for the nearest downval (peak) to the left that is greater than this peak.
-        if (self._down_vals[0: i] >= self._down_vals[i]).any():
-            idx_peak = np.max(np.where(self._down_vals[0: i] >= self._down_vals[i])[0])
-            nearest_peak_loc = self._down_locs[idx_peak]
-            L.debug("\tFound a higher previous peak ({value}) at location {loc}".format(
-                value=self._down_vals[idx_peak],
-                loc=nearest_peak_loc
-            ))
-            L.debug("\tSearching for smallest valley between loc {p1} & loc {p2}".format(
-                p1=nearest_peak_loc,
-                p2=self._down_locs[i]
-            ))
-            idx_up = idx_peak + np.argmin(self._up_vals[idx_peak:i])
-            L.debug("\t\tFound valley {val} at {loc}".format(
-                val=self._up_vals[idx_up],
-                loc=self._up_locs[idx_up]
-            ))
-            L.debug("\tSetting initial start_loc to {loc}".format(
-                loc=self._up_locs[idx_up],
-            ))
-            start_loc = self._up_locs[idx_up]
-        L.debug("\tChecking for a closer zero between {loc} and {loc2}".format(
-            loc=start_loc,
-            loc2=self._down_locs[i]
-        ))
-        if (self.S[start_loc+1:self._down_locs[i]]==0).any():
-            nearest_zero = start_loc + np.max(
-                np.where(self.S[start_loc:self._down_locs[i]]==0)[0]
-            )
-            L.debug("\t\tFound a closer zero at location {loc}".format(
-                loc=nearest_zero
-            ))
-            L.debug("\tUpdating start_loc to {zero} from {start_loc}".format(
-                    zero=nearest_zero,
-                    start_loc=start_loc
-                ))
+        idx_peak = self._prev_ge[i]
+        if idx_peak >= 0:
+            nearest_peak_loc = self.down_locs[idx_peak]
+            L.debug("\tFound a higher previous peak (%s) at location %s", self.down_vals[idx_peak], nearest_peak_loc)
+            L.debug("\tSearching for smallest valley between loc %s & loc %s", nearest_peak_loc, peak_loc)
+            idx_up = self._rmq(idx_peak, i)
+            L.debug("\t\tFound valley %s at %s", self.up_vals[idx_up], self.up_locs[idx_up])
+            L.debug("\tSetting initial start_loc to %s", self.up_locs[idx_up])
+            start_loc = self.up_locs[idx_up]
+        L.debug("\tChecking for a closer zero between %s and %s", start_loc, peak_loc)
+        k = np.searchsorted(self._zero_locs, peak_loc, side='left') - 1
+        if k >= 0 and self._zero_locs[k] > start_loc:
+            nearest_zero = self._zero_locs[k]
+            L.debug("\t\tFound a closer zero at location %s", nearest_zero)
+            L.debug("\tUpdating start_loc to %s from %s", nearest_zero, start_loc)
             start_loc = nearest_zero
         return start_loc, self.S[start_loc]
     
@@ -306,105 +582,94 @@ class Drawdown:
         """
         end_loc = len(self.S)-1
         L.debug("Looking for initial end position...")
-        L.debug("Drawdown {i} peak is {peak} at location {loc}".format(
-            i=i,
-            peak=self._down_vals[i],
-            loc=self._down_locs[i],
-        ))
-        if (self._down_vals[i+1:] >= self._down_vals[i]).any():
-            idx_peak = (i + 1) + np.min(np.where(self._down_vals[i+1:] >= self._down_vals[i])[0])
-            nearest_peak_loc = self._down_locs[idx_peak]
-            L.debug("\tFound a higher subsequent peak ({value}) at location {loc}".format(
-                value=self._down_vals[idx_peak],
-                loc=nearest_peak_loc
-            ))
-            L.debug("\tSearching for smallest valley between loc {p1} & loc {p2}".format(
-                    p1=self._down_locs[i],
-                    p2=nearest_peak_loc
-                ))
-            idx_up = i + np.argmin(self._up_vals[i:idx_peak])
-            L.debug("\t\tFound valley {val} at {loc}".format(
-                val=self._up_vals[idx_up],
-                loc=self._up_locs[idx_up]
-            ))
-            L.debug("\tSetting initial end_loc to {loc}".format(
-                loc=self._up_locs[idx_up],
-            ))
-            end_loc = self._up_locs[idx_up]
-            L.debug("\tChecking for a closer zero between {loc} and {loc2}".format(
-                loc=self._down_locs[i],
-                loc2=end_loc
-            ))
+        L.debug("Drawdown %s peak is %s at location %s", i, self.down_vals[i], self.down_locs[i])
+        peak_loc = self.down_locs[i]
+        idx_peak = self._next_ge[i]
+        if idx_peak < len(self.down_vals):
+            nearest_peak_loc = self.down_locs[idx_peak]
+            L.debug("\tFound a higher subsequent peak (%s) at location %s", self.down_vals[idx_peak], nearest_peak_loc)
+            L.debug("\tSearching for smallest valley between loc %s & loc %s", peak_loc, nearest_peak_loc)
+            idx_up = self._rmq(i, idx_peak)
+            L.debug("\t\tFound valley %s at %s", self.up_vals[idx_up], self.up_locs[idx_up])
+            L.debug("\tSetting initial end_loc to %s", self.up_locs[idx_up])
+            end_loc = self.up_locs[idx_up]
+            L.debug("\tChecking for a closer zero between %s and %s", peak_loc, end_loc)
         # Check to see if any of the values between this down_loc and the end_loc are zero
         # (do not use the current down_loc in the check)
-        if (self.S[self._down_locs[i]+1:end_loc]==0).any():
+        k = np.searchsorted(self._zero_locs, peak_loc, side='right')
+        if k < len(self._zero_locs) and self._zero_locs[k] < end_loc:
             # If there is a zero closer than the nearest down_loc, then use that value instead.
-            nearest_zero_loc = self._down_locs[i]+1 + np.min(
-                np.where(self.S[self._down_locs[i]+1:end_loc]==0)[0])
-            # nearest_zero_loc = self._down_locs[nearest_zero_idx]
-            if nearest_zero_loc > len(self.S)-1:
-                nearest_zero_loc = len(self.S)-1
-            L.debug("\t\tFound a zero at location {loc}".format(
-                loc=nearest_zero_loc
-            ))
-            if nearest_zero_loc < end_loc:
-                L.debug("\tUpdating end_loc to {zero} from {end_loc}".format(
-                    zero=nearest_zero_loc,
-                    end_loc=end_loc
-                ))
-                end_loc = nearest_zero_loc
+            nearest_zero_loc = self._zero_locs[k]
+            L.debug("\t\tFound a zero at location %s", nearest_zero_loc)
+            L.debug("\tUpdating end_loc to %s from %s", nearest_zero_loc, end_loc)
+            end_loc = nearest_zero_loc
         # If there are no future down_vals (peaks) that are larger than the current one,
         # and there are no future zeros in the timeseries, then we are going to
         # _assume_ that the end_val and end_loc are at the minimum of all future values.
         # essentially we set the end_val and end_loc to the smallest future up_loc.
         else:
-            L.debug(
-               f"\tNo larger peak found than {self._down_vals[i]} and no zero found.")
+            L.debug("\tNo larger peak found than %s and no zero found.", self.down_vals[i])
             L.debug("\tSetting end_val and end_loc to smallest future up_loc")
-            # Find the smallest future up_val:
-            minimum_up_val = np.min(self._up_vals[i:end_loc])
-            # Set nearest_minimum to the location of the minimum_up_val 
+            # Find the location of the smallest future up_val
             # in the list of up_vals
-            nearest_minimum_idx = i + np.where(
-                self._up_vals[i:end_loc]==np.min(self._up_vals[i:end_loc]))[0][0]
-            nearest_minimum_loc = self._up_locs[nearest_minimum_idx]
+            nearest_minimum_idx = self._rmq(i, end_loc)
+            nearest_minimum_loc = self.up_locs[nearest_minimum_idx]
             if nearest_minimum_loc > len(self.S)-1:
                 nearest_minimum_loc = len(self.S)-1
-            L.debug("\t\tFound a minimum at location {loc}".format(
-                loc=nearest_minimum_loc
-            ))
+            L.debug("\t\tFound a minimum at location %s", nearest_minimum_loc)
             if nearest_minimum_loc < end_loc:
-                L.debug("\tUpdating end_loc to {minimum} from {end_loc}".format(
-                    minimum=nearest_minimum_loc,
-                    end_loc=end_loc
-                ))
+                L.debug("\tUpdating end_loc to %s from %s", nearest_minimum_loc, end_loc)
                 end_loc = nearest_minimum_loc        
         return end_loc, self.S[end_loc]
 
+    def get_data(self, i):
+        """Returns the storage data for a drawdown.
+
+        Parameters
+        ----------
+        i : int
+            Row of `df` to return the data for
+
+        Returns
+        -------
+        np_array
+            view of `S` from the start_loc to the end_loc of the drawdown
+        """
+        row = self.df.iloc[i]
+        return self.S[int(row['start_loc']):int(row['end_loc'])+1]
+
     def to_csv(self, filename):
-        L.info(f"Writing drawdown data to {filename}")
+        L.info("Writing drawdown data to %s", filename)
+        # The drawdown data is not kept in `df`, so add it back for the output.
+        df = self.df.copy(deep=False)
+        df.insert(df.columns.get_loc('duration'), 'data', [
+            self.S[start:end+1] for start, end in zip(df['start_loc'], df['end_loc'])
+        ])
         if filename:
-            self.df.to_csv(filename)
+            df.to_csv(filename)
         else:
-            return self.df.to_csv()
+            return df.to_csv()
 
     def plot(self,
         min_loc=None, max_loc=None, threshold=0,
         show_up_locs=True, show_down_locs=True, offset=10):
-        
+        # pyplot is slow to import and only needed here.
+        import matplotlib.pyplot as plot
+        from matplotlib.collections import LineCollection
+
         if not min_loc:
             min_loc = 0
         if not max_loc:
             max_loc = len(self.S)
         data = self.S[min_loc:max_loc]
         slope = np.diff(data)
-        rev = np.diff((slope > 0).astype(int))
+        rev = np.diff((slope > 0).view(np.int8))
         down_locs,  = np.where(rev < 0)
         up_locs,  = np.where(rev > 0)
         up_vals = data[up_locs + 1]
         down_vals = data[down_locs + 1]
         valid = pd.DataFrame()
-        if not self.drawdowns is None:
+        if hasattr(self, 'df'):
             valid = self.df[(self.df['start_loc']>=min_loc) 
                             & (self.df['end_loc']<=max_loc)
                             & (self.df['magnitude']>=threshold)]
@@ -413,38 +678,48 @@ class Drawdown:
         else:
             show_drawdowns = False 
         plot.plot(data)
-        
+        ax = plot.gca()
+        # Draw each kind of marker as a single artist rather than one per point.
         # plot.plot(down_locs,down_vals,'r')
         if show_down_locs:
-            for loc, val in zip(down_locs, down_vals):
-                plot.annotate("",xy=(loc+1,val), xytext=(loc+1,val+offset),
-                            arrowprops=dict(arrowstyle="->",color="red"))
+            ax.quiver(down_locs+1, down_vals+offset,
+                      np.zeros(len(down_locs)), np.full(len(down_vals), -offset),
+                      color='red', angles='xy', scale_units='xy', scale=1, width=0.002)
         if show_up_locs:
-            for loc, val in zip(up_locs, up_vals):
-                plot.annotate("",xy=(loc+1,val), xytext=(loc+1,val-offset),
-                            arrowprops=dict(arrowstyle="->",color="green"))
+            ax.quiver(up_locs+1, up_vals-offset,
+                      np.zeros(len(up_locs)), np.full(len(up_vals), offset),
+                      color='green', angles='xy', scale_units='xy', scale=1, width=0.002)
         if show_drawdowns:
-            for index, row in valid.iterrows():
-                x = [row['start_loc']-min_loc,
-                    row['start_loc']-min_loc+row['duration']
-                    ]
-                y = [row['peak_val']+offset, row['peak_val']+offset]
-                plot.plot(x,y,'k')
-                plot.plot(x,y,'yellow',linewidth=7,alpha=0.5)
-                vx1 = [row['start_loc']-min_loc,
-                    row['start_loc']-min_loc]
-                vy1 = [row['peak_val']+offset,
-                    row['start_val']]
-                plot.plot(vx1,vy1,'k--', linewidth=0.5)
-                vx2 = [row['end_loc']-min_loc,
-                    row['end_loc']-min_loc]
-                vy2 = [row['peak_val']+offset,
-                    row['end_val']]
-                plot.plot(vx2,vy2,'k--', linewidth=0.5)
-                xt = row['start_loc']-min_loc+row['duration']/2
-                yt = row['peak_val']+offset*1.1
-                plot.text(xt,yt,"{m:.1f}".format(m=row['magnitude']))
-                plot.ylim(min(data)-1.2*offset,max(data)+1.4*offset)
+            x0 = (valid['start_loc']-min_loc).to_numpy()
+            x1 = x0 + valid['duration'].to_numpy()
+            xe = (valid['end_loc']-min_loc).to_numpy()
+            y = (valid['peak_val']+offset).to_numpy()
+            brackets = np.stack([np.column_stack([x0, y]), np.column_stack([x1, y])], axis=1)
+            ax.add_collection(LineCollection(brackets, colors='k'))
+            ax.add_collection(LineCollection(brackets, colors='yellow', linewidths=7, alpha=0.5))
+            starts = np.stack([np.column_stack([x0, y]),
+                               np.column_stack([x0, valid['start_val']])], axis=1)
+            ends = np.stack([np.column_stack([xe, y]),
+                             np.column_stack([xe, valid['end_val']])], axis=1)
+            ax.add_collection(LineCollection(np.concatenate([starts, ends]),
+                                             colors='k', linestyles='--', linewidths=0.5))
+            for xt, yt, m in zip((x0+x1)/2, y+offset*0.1, valid['magnitude']):
+                plot.text(xt, yt, "{m:.1f}".format(m=m))
+            plot.ylim(min(data)-1.2*offset,max(data)+1.4*offset)
+
+def find_drawdowns(data):
+    """Returns a DataFrame with one row per drawdown in a PAWS timeseries.
+
+    Same as `Drawdown(data=data, find_drawdowns=True).df`, except that
+    `peak_loc`, `start_loc` and `end_loc` index `data` itself rather than the
+    `S` with the leading 9.99 value. A drawdown starting at that leading value
+    starts at the first sample of `data` instead.
+    """
+    df = Drawdown(data=data, find_drawdowns=True).df
+    for col in ('peak_loc', 'start_loc', 'end_loc'):
+        df[col] = np.maximum(df[col] - 1, 0)
+    df['duration'] = df['end_loc'] - df['start_loc']
+    return df
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from Drawdown import Drawdown, find_drawdowns
+
+
+def test_last_peak_without_following_valley():
+    # The next higher peak comes after the last valley, so the valley search
+    # for drawdown 1 runs past the end of up_vals.
+    drawdown = Drawdown(data=np.array([10., 8, 8, 9, 7, 10, 4]),
+                        find_drawdowns=True)
+    assert len(drawdown.down_vals) > len(drawdown.up_vals)
+    assert drawdown.find_end(1) == (5, 7.0)
+    this = drawdown.find_drawdown(1)
+    row = drawdown.df.iloc[0]
+    for key in drawdown.df.columns:
+        assert this[key] == row[key]
+
+
+def test_find_drawdown_matches_df_without_smaller_value():
+    # Nothing left of the peak is as small as the end value (the data start
+    # above the 9.99 sentinel), so the provisional start_loc is kept.
+    drawdown = Drawdown(data=np.array([13., 12, 1, 11, 11, 6, 5, 13, 13]),
+                        find_drawdowns=True)
+    this = drawdown.find_drawdown(1)
+    row = drawdown.df.iloc[0]
+    assert (this['start_loc'], this['end_loc']) == (3, 7)
+    assert (row['start_loc'], row['end_loc']) == (3, 7)
+    assert this['duration'] == row['duration'] == 4
+
+
+def test_invalidate_drops_drawdowns():
+    drawdown = Drawdown(filename='toy_drawdown.csv', find_drawdowns=True)
+    drawdown.S = drawdown.S[:15]
+    drawdown.invalidate()
+    assert not hasattr(drawdown, 'df')
+    drawdown.make_drawdowns()
+    assert (drawdown.df['end_loc'] < len(drawdown.S)).all()
+
+
+def test_find_drawdowns_locations_index_data():
+    data = np.array(pd.read_csv('BoulderS.csv')).T.squeeze()
+    df = find_drawdowns(data)
+    assert (data[df['peak_loc']] == df['peak_val']).all()
+    assert (df['duration'] == df['end_loc'] - df['start_loc']).all()
+
+
+def test_to_csv_matches_expected_toy_output():
+    drawdown = Drawdown(filename='toy_drawdown.csv', find_drawdowns=True)
+    with open('toy_drawdown_expected.csv') as f:
+        assert drawdown.to_csv(None) == f.read()
+
+
+def test_find_drawdown_matches_make_drawdowns():
+    # find_drawdown and make_drawdowns implement the same steps separately
+    # (Python with logging vs. the compiled kernel), so they must agree on
+    # every drawdown.
+    for filename in ('toy_drawdown.csv', 'BoulderS.csv', 'SierraS.csv', 'calhounS.csv'):
+        drawdown = Drawdown(filename=filename, find_drawdowns=True)
+        rows = pd.DataFrame([drawdown.find_drawdown(i)
+                             for i in range(1, len(drawdown.df)+1)])
+        pd.testing.assert_frame_equal(
+            rows[drawdown.df.columns], drawdown.df, check_dtype=False)